@@ -8,6 +8,8 @@ from collections import defaultdict
 from ics import Calendar, Event
 import pytz
 
+from .utils import TimelineEvent
+
 try:
     from weasyprint import HTML
     WEASYPRINT_AVAILABLE = True
@@ -76,7 +78,7 @@ def _generate_pie_chart_svg(data, color_map):
 
 # --- Main HTML Generation Function ---
 
-def generate_schedule_html(events: List[Dict], program_colors: Dict[str, str], duration_summary: Dict[str, float], total_hours: float, pic_hours: Dict[str, float], bantu_hours: float) -> str:
+def generate_schedule_html(events: List[TimelineEvent], program_colors: Dict[str, str], duration_summary: Dict[str, float], total_hours: float, pic_hours: Dict[str, float], bantu_hours: float) -> str:
     """
     Generates a self-contained HTML string with advanced visualizations.
     """
@@ -128,7 +130,7 @@ def generate_schedule_html(events: List[Dict], program_colors: Dict[str, str], d
     # --- Data Processing for Visualizations ---
     daily_hours = defaultdict(float)
     for event in events:
-        daily_hours[event['start_time'].date()] += (event['end_time'] - event['start_time']).total_seconds() / 3600.0
+        daily_hours[event.start_time.date()] += (event.end_time - event.start_time).total_seconds() / 3600.0
     
     # --- Analytics Section ---
     html += "<h2>Analisis & Statistik Kegiatan</h2><div class='grid-container'>"
@@ -204,14 +206,14 @@ def generate_schedule_html(events: List[Dict], program_colors: Dict[str, str], d
     for date_key in sorted_dates:
         html += f'<div class="day-schedule"><h3>{date_key.strftime("%A, %d %B %Y")}</h3>'
         html += '<table><thead><tr><th class="time-col">Waktu</th><th>Judul Kegiatan</th><th class="program-col">Program</th></tr></thead><tbody>'
-        day_events = sorted([e for e in events if e['start_time'].date() == date_key], key=lambda x: x['start_time'])
+        day_events = sorted(e for e in events if e.start_time.date() == date_key)
         current_time = datetime.combine(date_key, time.min)
         for event in day_events:
-            if event['start_time'] > current_time:
-                html += f'<tr class="free-time-row"><td>{current_time.strftime("%H:%M")} - {event["start_time"].strftime("%H:%M")}</td><td>Waktu Luang</td><td>-</td></tr>'
-            color = pie_color_map.get(event["type"], '#cccccc')
-            html += f'<tr style="border-left: 4px solid {color};"><td>{event["start_time"].strftime("%H:%M")} - {event["end_time"].strftime("%H:%M")}</td><td>{event["title"]}</td><td>{event["type"]}</td></tr>'
-            current_time = event['end_time']
+            if event.start_time > current_time:
+                html += f'<tr class="free-time-row"><td>{current_time.strftime("%H:%M")} - {event.start_time.strftime("%H:%M")}</td><td>Waktu Luang</td><td>-</td></tr>'
+            color = pie_color_map.get(event.type, '#cccccc')
+            html += f'<tr style="border-left: 4px solid {color};"><td>{event.start_time.strftime("%H:%M")} - {event.end_time.strftime("%H:%M")}</td><td>{event.title}</td><td>{event.type}</td></tr>'
+            current_time = event.end_time
         end_of_day = datetime.combine(date_key + timedelta(days=1), time.min)
         if current_time < end_of_day:
             html += f'<tr class="free-time-row"><td>{current_time.strftime("%H:%M")} - 24:00</td><td>Waktu Luang</td><td>-</td></tr>'
@@ -240,7 +242,7 @@ def export_to_pdf(html_content: str, filename: str = "timeline_report.pdf"):
     except Exception as e:
         print(f"\n{Fore.RED}Terjadi kesalahan saat membuat PDF: {e}{Style.RESET_ALL}")
 
-def export_to_ics(events: List[Dict], filename: str = "kkn_schedule.ics"):
+def export_to_ics(events: List[TimelineEvent], filename: str = "kkn_schedule.ics"):
     """Exports the schedule to an .ics calendar file."""
     # Use the appropriate timezone for Indonesia (WIB)
     local_tz = pytz.timezone('Asia/Jakarta')
@@ -248,11 +250,11 @@ def export_to_ics(events: List[Dict], filename: str = "kkn_schedule.ics"):
 
     for event_data in events:
         e = Event()
-        e.name = event_data['title']
+        e.name = event_data.title
         # The datetimes from the app are naive, so we make them timezone-aware
-        e.begin = local_tz.localize(event_data['start_time'])
-        e.end = local_tz.localize(event_data['end_time'])
-        e.description = f"Program: {event_data['type']}"
+        e.begin = local_tz.localize(event_data.start_time)
+        e.end = local_tz.localize(event_data.end_time)
+        e.description = f"Program: {event_data.type}"
         c.events.add(e)
     
     try:
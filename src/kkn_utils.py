@@ -1,25 +1,29 @@
+import functools
+import logging
 import os
 from datetime import datetime
 from typing import Dict, List, Optional, Tuple
 import re
+import sys
 from dotenv import load_dotenv
-from .utils import generate_random_point
-from src import generative
+from .utils import TimelineEvent, generate_random_point
 from colorama import init, Fore, Style
 import getpass
 from collections import defaultdict
+from itertools import groupby
 init(autoreset=True)
 from src.simaster import (
     get_simaster_session, 
     get_kkn_programs, 
     get_logbook_entries_by_id,
+    get_logbook_entries_for_programs,
     get_bantu_pic_entries,
     create_sub_entry,
     create_bantu_pic_sub_entry,
     add_kkn_logbook_entry_by_id,
-    post_attendance_for_sub_entry
+    post_attendance_for_sub_entry,
+    post_attendance_for_sub_entries
 )
-from src.exporter import generate_schedule_html, export_to_html_file, export_to_pdf, export_to_ics
 
 load_dotenv()
 
@@ -229,6 +233,9 @@ def get_sub_entry_details_from_user(proker_title):
         jumDana = input("Enter amount of funds (jumlah dana, default: '0'): ") or "0"
 
     # --- AI or Manual Text Entry ---
+    # imported here: google.generativeai is slow to import and only needed now
+    from src import generative
+
     description_text = ""
     hasil_kegiatan_text = "Kegiatan terlaksana dengan baik."
 
@@ -312,9 +319,15 @@ def handle_post_attendance(session):
     if not main_entry:
         return
     
-    sub_entry = select_sub_entry(session, main_entry)
-    if not sub_entry:
-        return
+    unattended_entries = [se for se in main_entry.get('sub_entries', []) if not se.get('is_attended')]
+    post_all = len(unattended_entries) > 1 and input(
+        f"\nPost attendance for all {len(unattended_entries)} unattended sub-entries? (y/n): "
+    ).strip().lower() == 'y'
+
+    if not post_all:
+        sub_entry = select_sub_entry(session, main_entry)
+        if not sub_entry:
+            return
 
     try:
         latitude = float(os.getenv("KKN_LOCATION_LATITUDE"))
@@ -325,9 +338,23 @@ def handle_post_attendance(session):
 
     random_lat, random_lon = generate_random_point(latitude, longitude, 50)
     print(f"\nGenerated random point for attendance: (Lat: {random_lat}, Lon: {random_lon})")
-    
+
+    if post_all:
+        main_entry_index = main_entry.get('entry_index')
+        results = post_attendance_for_sub_entries(
+            session, program_mhs_id,
+            [(main_entry_index, se.get('title')) for se in unattended_entries],
+            random_lat, random_lon, target_program=program,
+        )
+        for (_, title), success in results.items():
+            status = f"{Fore.GREEN}Posted{Style.RESET_ALL}" if success else f"{Fore.RED}Failed{Style.RESET_ALL}"
+            print(f"  - [{status}] {title}")
+        print(f"\nAttendance posted for {sum(results.values())} of {len(results)} sub-entries.")
+        return
+
     success = post_attendance_for_sub_entry(
-        session, program_mhs_id, main_entry.get('entry_index'), sub_entry.get('title'), random_lat, random_lon
+        session, program_mhs_id, main_entry.get('entry_index'), sub_entry.get('title'), random_lat, random_lon,
+        target_program=program,
     )
 
     if success:
@@ -400,8 +427,19 @@ MONTH_MAP = {
 }
 MAIN_PROGRAM_COLORS = [Fore.CYAN, Fore.GREEN, Fore.YELLOW, Fore.BLUE, Fore.LIGHTRED_EX, Fore.MAGENTA, Fore.WHITE]
 
+# a single "8 juli 2025 19:00" stamp, the "- 16:00" end time that follows
+# it in same-day ranges, and the "s.d" joining the two stamps of an overnight
+# range. compiled once since parse_datetime_range runs for
+# every sub-entry; only known month names match, so MONTH_MAP can't miss.
+DATETIME_RE = re.compile(r'(\d{1,2})\s(' + '|'.join(MONTH_MAP) + r')\s(\d{4})\s(\d{2}):(\d{2})')
+END_TIME_RE = re.compile(r'\s+-\s+(\d{2}):(\d{2})')
+RANGE_SEP_RE = re.compile(r'\s+s\.d\s+')
 
 
+
+# the same date-time string shows up under several entries, and the result is
+# immutable, so repeated strings are served from the cache
+@functools.lru_cache(maxsize=512)
 def parse_datetime_range(datetime_str: Optional[str]) -> Tuple[Optional[datetime], Optional[datetime]]:
     """
     Parses complex date-time strings from Simaster into start and end datetime objects.
@@ -413,27 +451,30 @@ def parse_datetime_range(datetime_str: Optional[str]) -> Tuple[Optional[datetime
     datetime_str = datetime_str.lower().replace("wib", "").strip()
 
     try:
-        # Pattern for overnight ranges (e.g., "8 Juli 2025 19:00 s.d 9 Juli 2025 00:00")
-        overnight_match = re.search(r'(\d{1,2})\s(\w+)\s(\d{4})\s(\d{2}:\d{2})\s+s\.d\s+(\d{1,2})\s(\w+)\s(\d{4})\s(\d{2}:\d{2})', datetime_str)
-        if overnight_match:
-            d1, m1_str, y1, t1, d2, m2_str, y2, t2 = overnight_match.groups()
-            start_dt = datetime(int(y1), MONTH_MAP[m1_str], int(d1), int(t1[:2]), int(t1[3:]))
-            end_dt = datetime(int(y2), MONTH_MAP[m2_str], int(d2), int(t2[:2]), int(t2[3:]))
-            return start_dt, end_dt
-
-        # Pattern for same-day ranges (e.g., "2 Juli 2025 13:00 - 16:00")
-        sameday_match = re.search(r'(\d{1,2})\s(\w+)\s(\d{4})\s(\d{2}:\d{2})\s+-\s+(\d{2}:\d{2})', datetime_str)
-        if sameday_match:
-            d, m_str, y, t1, t2 = sameday_match.groups()
-            start_dt = datetime(int(y), MONTH_MAP[m_str], int(d), int(t1[:2]), int(t1[3:]))
-            end_dt = datetime(int(y), MONTH_MAP[m_str], int(d), int(t2[:2]), int(t2[3:]))
+        # one pass collects every full date-time stamp in the string
+        stamps = list(DATETIME_RE.finditer(datetime_str))
+
+        # Overnight ranges (e.g., "8 Juli 2025 19:00 s.d 9 Juli 2025 00:00")
+        if len(stamps) >= 2 and RANGE_SEP_RE.fullmatch(
+            datetime_str, stamps[0].end(), stamps[1].start()
+        ):
+            d1, m1_str, y1, h1, min1 = stamps[0].groups()
+            d2, m2_str, y2, h2, min2 = stamps[1].groups()
+            start_dt = datetime(int(y1), MONTH_MAP[m1_str], int(d1), int(h1), int(min1))
+            end_dt = datetime(int(y2), MONTH_MAP[m2_str], int(d2), int(h2), int(min2))
             return start_dt, end_dt
-        
-        # Fallback for overnight ranges without a start date (e.g., "21:00 s.d 18 Juli 2025 00:00")
-        overnight_fallback_match = re.search(r'(\d{2}:\d{2})\s+s\.d\s+(\d{1,2})\s(\w+)\s(\d{4})\s(\d{2}:\d{2})', datetime_str)
-        if overnight_fallback_match:
-             return None, None
 
+        # Same-day ranges (e.g., "2 Juli 2025 13:00 - 16:00"). An overnight range
+        # without a start date (e.g., "21:00 s.d 18 Juli 2025 00:00") has no
+        # end time after its only stamp and is left unparsed.
+        if stamps:
+            end_match = END_TIME_RE.match(datetime_str, stamps[0].end())
+            if end_match:
+                d, m_str, y, h1, min1 = stamps[0].groups()
+                h2, min2 = end_match.groups()
+                start_dt = datetime(int(y), MONTH_MAP[m_str], int(d), int(h1), int(min1))
+                end_dt = datetime(int(y), MONTH_MAP[m_str], int(d), int(h2), int(min2))
+                return start_dt, end_dt
 
     except (ValueError, KeyError) as e:
         return None, None
@@ -442,7 +483,7 @@ def parse_datetime_range(datetime_str: Optional[str]) -> Tuple[Optional[datetime
 
 
 
-def visualize_schedule_plot(events: List[Dict], program_colors: Dict[str, str]):
+def visualize_schedule_plot(events: List[TimelineEvent], program_colors: Dict[str, str]):
     """
     Displays the schedule in a Gantt-like chart in the console.
     """
@@ -450,41 +491,40 @@ def visualize_schedule_plot(events: List[Dict], program_colors: Dict[str, str]):
         print("No events to visualize.")
         return
 
-    print("\n" + "="*85)
-    print(" " * 28 + "VISUALISASI JADWAL KEGIATAN")
-    print(f" " * 20 + f"(Waktu Saat Ini: {datetime.now().strftime('%A, %d %b %Y, %H:%M WIB')})")
-    print("="*85 + "\n")
+    # the chart is built up as a list of lines and written in one go
+    out = [
+        "\n" + "="*85,
+        " " * 28 + "VISUALISASI JADWAL KEGIATAN",
+        f" " * 20 + f"(Waktu Saat Ini: {datetime.now().strftime('%A, %d %b %Y, %H:%M WIB')})",
+        "="*85 + "\n",
+    ]
 
     # --- Legend ---
-    print("Legenda:")
+    out.append("Legenda:")
     for title, color in program_colors.items():
-        print(f"  {color}█ {Style.RESET_ALL}{title[:50]}")
-    if any(e['type'] == 'Program Bantu' for e in events):
-        print(f"  {Fore.MAGENTA}█ {Style.RESET_ALL}Program Bantu")
-    print("")
+        out.append(f"  {color}█ {Style.RESET_ALL}{title[:50]}")
+    if any(e.type == 'Program Bantu' for e in events):
+        out.append(f"  {Fore.MAGENTA}█ {Style.RESET_ALL}Program Bantu")
+    out.append("")
 
     # --- Group events by date ---
-    events_by_date = {}
-    for event in events:
-        date_key = event['start_time'].date()
-        if date_key not in events_by_date:
-            events_by_date[date_key] = []
-        events_by_date[date_key].append(event)
-
-    sorted_dates = sorted(events_by_date.keys())
-    for date_key in sorted_dates:
-        print(f"--- {date_key.strftime('%A, %d %B %Y')} ---")
-        day_events = sorted(events_by_date[date_key], key=lambda x: x['start_time'])
+    # one chronological sort puts each day's events next to each other, so
+    # the date header is formatted once per day and each event only needs
+    # its times
+    for date_key, day_events in groupby(sorted(events), key=lambda e: e.start_time.date()):
+        out.append(f"--- {date_key.strftime('%A, %d %B %Y')} ---")
         for event in day_events:
-            start_str = event['start_time'].strftime('%H:%M')
-            end_str = event['end_time'].strftime('%H:%M')
-            duration_hours = (event['end_time'] - event['start_time']).total_seconds() / 3600
+            start_str = f"{event.start_time:%H:%M}"
+            end_str = f"{event.end_time:%H:%M}"
+            duration_hours = (event.end_time - event.start_time).total_seconds() / 3600
             bar_length = int(duration_hours * 4) 
             bar = '█' * bar_length
             
-            color = event.get('color', Fore.WHITE)
-            print(f"  [{start_str} - {end_str}] {color}{bar}{Style.RESET_ALL} {event['title']}")
-        print("")
+            color = event.color or Fore.WHITE
+            out.append(f"  [{start_str} - {end_str}] {color}{bar}{Style.RESET_ALL} {event.title}")
+        out.append("")
+
+    sys.stdout.write("\n".join(out) + "\n")
 
 def handle_generate_timeline(session):
     """
@@ -511,10 +551,12 @@ def handle_generate_timeline(session):
         if prog_title not in program_colors:
             program_colors[prog_title] = MAIN_PROGRAM_COLORS[color_index % len(MAIN_PROGRAM_COLORS)]
             color_index += 1
+    for prog in programs:
+        print(f"  - Menganalisis program utama: {prog['title'][:40]}...")
+    entries_by_program = get_logbook_entries_for_programs(session, programs)
     for prog in programs:
         prog_title = prog['title']
-        print(f"  - Menganalisis program utama: {prog_title[:40]}...")
-        entries = get_logbook_entries_by_id(session, prog['program_mhs_id'])
+        entries = entries_by_program.get(prog['program_mhs_id'])
         if entries:
             for entry in entries:
                 for sub_entry in entry.get('sub_entries', []):
@@ -522,7 +564,7 @@ def handle_generate_timeline(session):
                     if start_time and end_time:
                         duration = (end_time - start_time).total_seconds() / 3600.0
                         main_program_hours[prog_title] += duration
-                        all_events.append({'title': sub_entry['title'], 'start_time': start_time, 'end_time': end_time, 'type': prog_title, 'color': program_colors[prog_title]})
+                        all_events.append(TimelineEvent(start_time, end_time, sub_entry['title'], prog_title, program_colors[prog_title]))
     print("  - Menganalisis program bantu...")
     bantu_entries = get_bantu_pic_entries(session, programs[0])
     if bantu_entries:
@@ -534,7 +576,7 @@ def handle_generate_timeline(session):
                     duration = (end_time - start_time).total_seconds() / 3600.0
                     bantu_hours += duration
                     pic_hours[pic_name] += duration
-                    all_events.append({'title': sub_entry['title'], 'start_time': start_time, 'end_time': end_time, 'type': 'Program Bantu', 'color': Fore.MAGENTA})
+                    all_events.append(TimelineEvent(start_time, end_time, sub_entry['title'], 'Program Bantu', Fore.MAGENTA))
     if not all_events:
         print(f"{Fore.YELLOW}No activities found to generate a timeline.{Style.RESET_ALL}")
         return
@@ -573,6 +615,8 @@ def handle_generate_timeline(session):
         return
 
     print(f"\n{Fore.CYAN}Generating content for export...{Style.RESET_ALL}")
+    # imported here so startup doesn't pay for weasyprint, ics and pytz
+    from src.exporter import generate_schedule_html, export_to_html_file, export_to_pdf, export_to_ics
 
     # Generate HTML/PDF if needed
     if choice in ['1', '2', '4']:
@@ -604,10 +648,11 @@ def handle_check_all_attendance(session):
         print(f"{Fore.YELLOW}No main programs found.{Style.RESET_ALL}")
         return
 
+    entries_by_program = get_logbook_entries_for_programs(session, programs)
     for prog in programs:
         prog_title = prog.get('program_mhs_judul', 'Unknown Program')
         print(f"\n{Fore.CYAN}Program: {prog_title}{Style.RESET_ALL}")
-        entries = get_logbook_entries_by_id(session, prog['program_mhs_id'])
+        entries = entries_by_program.get(prog['program_mhs_id'])
         if not entries:
             print("  No logbook entries found for this program.")
             continue
@@ -676,6 +721,8 @@ def handle_change_account():
     return session
 def main():
     """Main function to run the interactive CLI."""
+    # MALAS_LOG picks the log level, e.g. WARNING to only see problems
+    logging.basicConfig(level=os.getenv("MALAS_LOG", "INFO").upper(), format="%(message)s")
     username = os.getenv("SIMASTER_USERNAME")
     password = os.getenv("SIMASTER_PASSWORD")
 
@@ -1,3 +1,4 @@
+import logging
 import os
 import random
 import time
@@ -10,6 +11,8 @@ from dotenv import load_dotenv
 load_dotenv()
 
 def main():
+    # MALAS_LOG picks the log level, e.g. WARNING to only see problems
+    logging.basicConfig(level=os.getenv("MALAS_LOG", "INFO").upper(), format="%(message)s")
     print("--- KKN Attendance Server Starting ---")
 
     # load envs
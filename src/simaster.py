@@ -4,26 +4,364 @@ The interactions include logging in, fetching academic schedules and posting
 KKN (Kuliah Kerja Nyata) attendance
 """
 
+import codecs
+import functools
 import hashlib
+import html
 import re
 import json
+import logging
+import os
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List, Optional 
+from types import MappingProxyType
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
 import cachelib
 import requests
-from lxml.html.soupparser import fromstring
-from lxml.html import tostring
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from lxml import etree
+from lxml.html import HTMLParser, HtmlElementClassLookup, fromstring
+
+try:
+    import brotli  # noqa: F401 - lets urllib3 decode "br" encoded responses
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+log = logging.getLogger(__name__)
 
 BASE_URL = "https://simaster.ugm.ac.id"
 HOME_URL = f"{BASE_URL}/beranda"
 LOGIN_URL = f"{BASE_URL}/services/simaster/service_login"
+ACCEPT_ENCODING = "gzip, deflate, br" if BROTLI_AVAILABLE else "gzip, deflate"
+
+SESSION_TIMEOUT = 60 * 60 * 24 * 2  # 2 days
+# a cached session confirmed to work this recently is used without validating.
+SESSION_FRESH_FOR = 15 * 60
+# applied to every request that does not pass its own timeout.
+REQUEST_TIMEOUT = 20
+
+# logged-in sessions are kept on disk so a new process (e.g. the next run of
+# the CLI) can skip the login.
+@functools.lru_cache(maxsize=None)
+def _session_store() -> cachelib.FileSystemCache:
+    """
+    Opens the on-disk session cache on first use, so importing the module
+    does not touch the home directory.
+    """
+    return cachelib.FileSystemCache(
+        cache_dir=os.path.expanduser("~/.cache/malas-kkn"),
+        threshold=50,
+        default_timeout=SESSION_TIMEOUT,
+    )
+
+
+# program lists belong to the in-memory session object, so each session gets
+# its own small cache that is dropped together with the session (an `id()`
+# key could be reused by a later session).
+_session_caches: "weakref.WeakKeyDictionary[requests.Session, cachelib.SimpleCache]" = (
+    weakref.WeakKeyDictionary()
+)
+
+# SIMASTER serves well-formed HTML, so the native libxml2 parser is enough.
+# one parser instance is shared by every parse in this module. ids are
+# collected so XPath's id() can jump straight to an element.
+_PARSER = HTMLParser(encoding="utf-8", remove_blank_text=True, collect_ids=True)
+
+# patterns scraped out of SIMASTER pages, compiled once. the byte patterns run
+# directly against `response.content` so the body is never decoded to str.
+_RE_TOKEN = re.compile(rb'name="simasterUGM_token" value="(.+?)"')
+# the closing quote is part of the match so a streamed search can't accept a
+# url cut off at a chunk boundary.
+_RE_DATA_URL = re.compile(
+    rb"'url'\s*:\s*[\"'](https://simaster\.ugm\.ac\.id/kkn/kkn/logbook_program_data/[^\"']+)[\"']"
+)
+# the error box of an html error page, and the tags inside it. the box holds
+# plain text, so a regex is enough and the page is never parsed.
+_RE_NOTE_DANGER = re.compile(rb'<div[^>]*class="note note-danger"[^>]*>(.*?)</div>', re.DOTALL)
+_RE_TAG = re.compile(rb"<[^>]+>")
+_RE_ADD_LINK = re.compile(rb"<a href='([^']+)'[^>]*title='Tambah'>")
+# the program's action cell comes from the DataTables JSON, so this one is str.
+_RE_RPP_URL = re.compile(r"href='([^']+logbook_program_rpp[^']+)'")
+# the text of a sub-entry row, "Title (Date and Time) [Duration]". these run
+# once per row, so they must not be compiled inside the row loops.
+_RE_SUB_ENTRY = re.compile(
+    r'^(?P<title>.*?)\s+'
+    r'\((?P<datetime_str>.*? \d{2}:\d{2}.*?)\)\s+'
+    r'\[(?P<duration>.*?)\]'
+)
+_RE_BANTU_SUB_ENTRY = re.compile(r'^(?P<title>.*?)\s\((?P<datetime_str>.*?WIB)\)')
+
+# the cells of a table row, compiled once since it runs for every row.
+_ROW_TDS = etree.XPath("./td")
+
+# the "Program Bantu" table on the RPP page, and the body rows of its panel.
+_BANTU_TABLE_XPATH = etree.XPath("id('subcontent-element')/div[4]/div[2]/div[2]/table")
+_BANTU_ROWS_XPATH = etree.XPath(".//table/tbody/tr")
+
+# the "Pelaksanaan Program" link on the KKN main page, tested on each closed
+# <a> while the page streams in. the label is matched ignoring case.
+_LOGBOOK_LINK_XPATH = etree.XPath(
+    "self::a[contains(@href,'logbook_program')]"
+    "[contains(translate(normalize-space(.),'ABCDEFGHIJKLMNOPQRSTUVWXYZ','abcdefghijklmnopqrstuvwxyz'),"
+    "'pelaksanaan program')]/@href"
+)
+
+# the sub-entry ("kegiatan") link inside a logbook row's action cell.
+_KEGIATAN_XPATH = etree.XPath(".//a[contains(@href,'logbook_kegiatan')]/@href")
+
+# the constant part of the DataTables request behind the "Pelaksanaan Program"
+# table; only the csrf token changes between calls. read-only, so a caller
+# can't change it for the calls after it. a length of -1 is DataTables for
+# "all rows", so one request returns every program instead of the first 25.
+_LOGBOOK_POST_TEMPLATE = MappingProxyType({
+    "draw": "1", "start": "0", "length": "-1",
+    "search[value]": "", "search[regex]": "false", "dt": "{}",
+    "columns[0][data]": "no", "columns[0][name]": "", "columns[0][searchable]": "false", "columns[0][orderable]": "false", "columns[0][search][value]": "", "columns[0][search][regex]": "false",
+    "columns[1][data]": "program_nama", "columns[1][name]": "", "columns[1][searchable]": "true", "columns[1][orderable]": "true", "columns[1][search][value]": "", "columns[1][search][regex]": "false",
+    "columns[2][data]": "program_mhs_judul", "columns[2][name]": "", "columns[2][searchable]": "true", "columns[2][orderable]": "true", "columns[2][search][value]": "", "columns[2][search][regex]": "false",
+    "columns[3][data]": "program_jenis_id", "columns[3][name]": "", "columns[3][searchable]": "true", "columns[3][orderable]": "true", "columns[3][search][value]": "", "columns[3][search][regex]": "false",
+    "columns[4][data]": "program_mhs_keberlanjutan", "columns[4][name]": "", "columns[4][searchable]": "true", "columns[4][orderable]": "true", "columns[4][search][value]": "", "columns[4][search][regex]": "false",
+    "columns[5][data]": "status_nama", "columns[5][name]": "", "columns[5][searchable]": "true", "columns[5][orderable]": "true", "columns[5][search][value]": "", "columns[5][search][regex]": "false",
+    "columns[6][data]": "action", "columns[6][name]": "", "columns[6][searchable]": "false", "columns[6][orderable]": "false", "columns[6][search][value]": "", "columns[6][search][regex]": "false",
+})
+
+
+@functools.lru_cache(maxsize=32)
+def get_cache_key(username: str, password: str) -> str:
+    """Creates a unique cache key from username and password."""
+    return hashlib.blake2b(f"{username}:{password}".encode(), digest_size=16).hexdigest()
+
+
+class _TimeoutHTTPAdapter(HTTPAdapter):
+    """An `HTTPAdapter` that applies a default timeout to every request."""
+
+    def __init__(self, *args, timeout: float = REQUEST_TIMEOUT, **kwargs):
+        self.timeout = timeout
+        super().__init__(*args, **kwargs)
+
+    def send(self, request, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        return super().send(request, **kwargs)
+
+
+# one adapter, and so one connection pool, is shared by every session the
+# module creates. a cached session that turns out to be stale and the fresh
+# login that replaces it then reuse the same keep-alive connection. cookies
+# live on the `Session`, so separate accounts still stay apart.
+_ADAPTER = _TimeoutHTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=16,
+    # only reads are retried on a gateway error: a POST that timed out at the
+    # gateway may still have gone through, and re-sending it would duplicate a
+    # logbook entry or attendance. failed connects are retried for any method,
+    # since nothing reached the server.
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.3,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset(["GET", "HEAD"]),
+    ),
+)
+
+
+def _new_session() -> requests.Session:
+    """
+    Creates a `Session` on the shared pooled, retrying adapter so the chained
+    calls to SIMASTER reuse keep-alive connections and survive transient 5xx
+    errors.
+    """
+    ses = requests.Session()
+    # mounted for http:// too so a redirect off https does not fall back to
+    # requests' default, unpooled adapter.
+    ses.mount("https://", _ADAPTER)
+    ses.mount("http://", _ADAPTER)
+    ses.headers.update({"User-Agent": "malas-kkn/1.0", "Accept-Encoding": ACCEPT_ENCODING})
+    return ses
 
-cache = cachelib.SimpleCache()
 
+def _parse_html(content: bytes):
+    """
+    Parses an HTML response body with lxml's native parser. libxml2 recovers
+    from broken markup on its own; it only raises `etree.ParserError` for an
+    empty body, which callers treat like any other failed page.
+    """
+    return fromstring(content, parser=_PARSER)
 
-def get_cache_key(username: str, password: str) -> str:
-    """Creates a unique cache key from username and password."""
-    return hashlib.md5(f"{username}:{password}".encode()).hexdigest()
+
+def _json_object(body: bytes) -> Optional[Dict]:
+    """
+    Decodes a response body as a JSON object. SIMASTER answers failed posts
+    with an html page, so a body that does not start with `{` (after an
+    optional UTF-8 BOM and whitespace) is rejected without running it through
+    the json decoder and `None` is returned.
+    """
+    if body.startswith(codecs.BOM_UTF8):
+        body = body[len(codecs.BOM_UTF8):]
+    if body.lstrip()[:1] != b"{":
+        return None
+    try:
+        return _json_loads(body)
+    except ValueError:
+        return None
+
+
+def _json(response: requests.Response):
+    """
+    Decodes a JSON response straight from its bytes, with orjson if it is
+    installed. Anything the fast path rejects goes through `response.json()`
+    so failures still raise requests' own `JSONDecodeError`.
+    """
+    try:
+        return _json_loads(response.content)
+    except ValueError:
+        return response.json()
+
+
+def _search_stream(response: requests.Response, pattern: "re.Pattern[bytes]"):
+    """
+    Searches a streamed response for a byte pattern, reading only as much of
+    the body as it takes to find the first match. The response is closed
+    either way. Returns the match, or `None` if the body has none.
+    """
+    buf = bytearray()
+    try:
+        for chunk in response.iter_content(chunk_size=8192):
+            # re-scan a little of the previous chunk so a match split across
+            # the chunk boundary is still found
+            pos = max(len(buf) - 512, 0)
+            buf += chunk
+            match = pattern.search(buf, pos)
+            if match:
+                return match
+        return None
+    finally:
+        response.close()
+
+
+def _find_link_stream(response: requests.Response, link_xpath: etree.XPath) -> Optional[str]:
+    """
+    Incrementally parses a streamed HTML response and returns the first href
+    `link_xpath` yields for a closed `<a>` element, without reading the rest
+    of the body. The response is closed either way.
+    """
+    parser = etree.HTMLPullParser(events=("end",), tag="a", encoding="utf-8")
+
+    def first_hit():
+        for _, link in parser.read_events():
+            hrefs = link_xpath(link)
+            if hrefs:
+                return hrefs[0]
+        return None
+
+    try:
+        for chunk in response.iter_content(chunk_size=8192):
+            parser.feed(chunk)
+            href = first_hit()
+            if href:
+                return href
+        parser.close()
+        return first_hit()
+    finally:
+        response.close()
+
+
+def _iter_table_rows(response: requests.Response, table_id: str):
+    """
+    Incrementally parses a streamed HTML response and yields the `<tr>` rows of
+    the `<tbody>` of the table with the given id as soon as each row is closed.
+
+    A row is cleared (together with the rows before it) once the caller moves
+    on, so only the row being looked at is kept in memory. Anything the caller
+    needs from a row must be extracted before advancing the generator. Rows of
+    other tables are cleared as soon as they are closed, unless they belong to
+    a table nested inside the wanted one.
+    """
+    parser = etree.HTMLPullParser(
+        events=("end",), tag="tr", encoding="utf-8", remove_blank_text=True
+    )
+    parser.set_element_class_lookup(HtmlElementClassLookup())
+
+    def matching_rows():
+        for _, row in parser.read_events():
+            tbody = row.getparent()
+            table = tbody.getparent() if tbody is not None and tbody.tag == "tbody" else None
+            if table is None or table.get("id") != table_id:
+                # a row of a table nested in one of our cells is still part of
+                # that cell; it goes when its row is cleared
+                if not any(t.get("id") == table_id for t in row.iterancestors("table")):
+                    row.clear(keep_tail=True)
+                continue
+            yield row
+            row.clear(keep_tail=True)
+            while row.getprevious() is not None:
+                del tbody[0]
+
+    try:
+        for chunk in response.iter_content(chunk_size=16384):
+            parser.feed(chunk)
+            yield from matching_rows()
+        parser.close()
+        yield from matching_rows()
+    finally:
+        response.close()
+
+
+def _get_csrf_token(jar) -> Optional[str]:
+    """
+    Returns the value of the `simasterUGM_cookie` CSRF cookie in a cookie jar.
+    The jar can hold several of them, so it is searched from the end for the
+    last (most specific) one instead of using `.get()`, which raises on
+    duplicates.
+    """
+    for cookie in reversed(list(jar)):
+        if cookie.name == 'simasterUGM_cookie':
+            return cookie.value
+    return None
+
+
+def _store_session(key: str, ses: requests.Session) -> None:
+    """
+    Caches what is needed to rebuild a session. The `Session` itself holds
+    locks and adapters that can't be pickled, so only its cookie jar and
+    headers are stored. The jar is kept whole so each cookie's domain, path
+    and expiry survive the round trip. The time of storing is kept too, so a
+    session that was just confirmed to work isn't validated again.
+    """
+    _session_store().set(key, (ses.cookies, dict(ses.headers), time.time()), timeout=SESSION_TIMEOUT)
+
+
+def _load_cached_session(key: str) -> Optional[Tuple[requests.Session, float]]:
+    """
+    Rebuilds a session stored by `_store_session` and returns it with the
+    number of seconds since it was stored, or returns `None`. A session whose
+    cookies have all expired is treated as missing, so it is not worth a
+    validation request.
+    """
+    cached = _session_store().get(key)
+    if not cached:
+        return None
+    cookies, headers, *stored_at = cached
+    ses = _new_session()
+    ses.headers.update(headers)
+    ses.cookies.update(cookies)
+    ses.cookies.clear_expired_cookies()
+    if not ses.cookies:
+        _session_store().delete(key)
+        return None
+    age = time.time() - stored_at[0] if stored_at else float("inf")
+    return ses, age
 
 
 def get_simaster_session(
@@ -36,40 +374,53 @@ def get_simaster_session(
     # 1. try to get a valid session from the cache
     key = get_cache_key(username, password)
     if reuse_session:
-        ses = cache.get(key)
+        cached = _load_cached_session(key)
+        ses, age = cached if cached else (None, None)
+        if ses and age < SESSION_FRESH_FOR:
+            log.debug("Cached session was confirmed %d seconds ago. Skipping validation.", age)
+            return ses
         if ses:
-            print("Found cached session. Validating...")
-            # validate session by checking if we can access the homepage
+            log.debug("Found cached session. Validating...")
+            # validate session by checking if we can access the homepage.
+            # only the status code matters, so skip the body and don't follow
+            # the redirect an expired session gets sent to the login page.
+            # a 302 therefore means invalid; a server refusing HEAD (405)
+            # gets the same check as a GET.
             try:
-                req = ses.get(HOME_URL, timeout=10)
+                req = ses.head(HOME_URL, timeout=5, allow_redirects=False)
+                if req.status_code == 405:
+                    req = ses.get(HOME_URL, timeout=5, allow_redirects=False, stream=True)
+                    req.close()
                 if req.status_code == 200:
-                    print("Cached session is valid.")
+                    log.debug("Cached session is valid.")
+                    # refresh the timestamp (and any cookies the server rotated)
+                    _store_session(key, ses)
                     return ses
                 else:
-                    print("Cached session is invalid or expired.")
+                    log.info("Cached session is invalid or expired.")
             except requests.exceptions.RequestException as e:
-                print(f"Failed to validate cached session: {e}")
+                log.warning("Failed to validate cached session: %s", e)
 
     # 2. if no valid cached session, create a new one
-    print("Attempting a new login...")
-    ses = requests.Session()
+    log.info("Attempting a new login...")
+    ses = _new_session()
     login_data = {"aId": "", "username": username, "password": password}
     try:
         req = ses.post(LOGIN_URL, data=login_data)
         req.raise_for_status()
 
-        response_json = req.json()
+        response_json = _json(req)
         if response_json.get("isLogin") == 1:
-            print(f"Successfully logged in as {response_json.get('namaLengkap')}.")
+            log.info("Successfully logged in as %s.", response_json.get('namaLengkap'))
             # cache for 2 days
-            cache.set(key, ses, timeout=60 * 60 * 24 * 2)
+            _store_session(key, ses)
             return ses
         else:
-            print("Login failed. Please check your username and password.")
+            log.warning("Login failed. Please check your username and password.")
             return None
 
     except requests.exceptions.RequestException as e:
-        print(f"An error occurred during login: {e}")
+        log.warning("An error occurred during login: %s", e)
         return None
 def post_kkn_presensi(
     ses: requests.Session, latitude: float, longitude: float, tanggal_presensi: str
@@ -81,61 +432,127 @@ def post_kkn_presensi(
     and then checks the JSON response for a success status.
     """
     presensi_url = f"{BASE_URL}/kkn/presensi/add"
-    print(f"\nAccessing KKN attendance page at {presensi_url}...")
+    log.debug("Accessing KKN attendance page at %s...", presensi_url)
 
     try:
         # get csrf token
         # token is ses dict value of property simasterUGM_cookie
-        token = ses.cookies.get('simasterUGM_cookie')
+        token = _get_csrf_token(ses.cookies)
         if token is None:
-            print("token not found in cache, fetching from KKN page...")
-            page_req = ses.get(presensi_url)
+            log.debug("token not found in cache, fetching from KKN page...")
+            page_req = ses.get(presensi_url, stream=True)
             page_req.raise_for_status()
         
-            token_match = re.search(r'name="simasterUGM_token" value="(.+?)"', page_req.text)
+            token_match = _search_stream(page_req, _RE_TOKEN)
             if not token_match:
-                print("Could not find simasterUGM_token on the KKN page.")
+                log.warning("Could not find simasterUGM_token on the KKN page.")
                 return False
-            token = token_match.group(1)
-            print(f"Found KKN page simasterUGM_token: {token}")
+            token = token_match.group(1).decode()
+            log.debug("Found KKN page simasterUGM_token: %s", token)
 
         presensi_data = {
             "simasterUGM_token": token,
             "tanggalPresensi": tanggal_presensi,
             "agreement": "1",
-            "latitude": str(latitude),
-            "longtitude": str(longitude),
+            "latitude": format(latitude, ".6f"),
+            "longtitude": format(longitude, ".6f"),
         }
 
-        print(f"Posting attendance for {tanggal_presensi}...")
+        log.info("Posting attendance for %s...", tanggal_presensi)
         response = ses.post(presensi_url, data=presensi_data)
         response.raise_for_status()
 
-        try:
-            # a successful post returns a json object.
-            response_json = response.json()
+        # a successful post returns a json object, a failed post (e.g., already
+        # attended) returns an html page.
+        body = response.content
+        response_json = _json_object(body)
+        if response_json is not None:
             if response_json.get("status") == "success":
-                print(f"Success message from server: {response_json.get('msg')}")
+                log.info("Success message from server: %s", response_json.get('msg'))
                 return True
-            else:
-                print(f"Post failed. Server response: {response_json}")
-                return False
-        except requests.exceptions.JSONDecodeError:
-            # a failed post (e.g., already attended) returns an html page.
-            # parsing the HTML to extract the error message
-            print("Post failed. Did not receive a valid JSON response from the server.")
-            tree = fromstring(response.text)
-            error_node = tree.find('.//div[@class="note note-danger"]')
-            if error_node is not None:
-                error_message = error_node.text_content().strip()
-                print(f"Error message found in HTML: '{error_message}'")
+            log.warning("Post failed. Server response: %s", response_json)
             return False
 
+        # pulling the error message out of the HTML
+        log.warning("Post failed. Did not receive a valid JSON response from the server.")
+        error_match = _RE_NOTE_DANGER.search(body)
+        if error_match:
+            error_html = _RE_TAG.sub(b"", error_match.group(1)).decode("utf-8", "replace")
+            error_message = html.unescape(error_html).strip()
+            log.warning("Error message found in HTML: '%s'", error_message)
+        return False
+
     except requests.exceptions.RequestException as e:
-        print(f"An error occurred while posting attendance: {e}")
+        log.warning("An error occurred while posting attendance: %s", e)
         return False
 
-def get_kkn_programs(ses: requests.Session) -> Optional[List[Dict]]:
+def _session_cache(ses: requests.Session) -> cachelib.SimpleCache:
+    """Returns the per-process cache of a session, creating it on first use."""
+    session_cache = _session_caches.get(ses)
+    if session_cache is None:
+        session_cache = _session_caches[ses] = cachelib.SimpleCache()
+    return session_cache
+
+
+def _invalidate_programs(ses: requests.Session) -> None:
+    """Drops the cached program list of a session so the next call refetches it."""
+    _session_cache(ses).delete("programs")
+
+
+def _load_programs(
+    ses: requests.Session, force_refresh: bool = False
+) -> Optional[Tuple[List[Dict], Dict[str, Dict]]]:
+    """
+    Returns the program list of a session together with an index of it keyed
+    by `program_mhs_id`. Both are cached per session for a short time, since
+    most workflows look the same list up several times in a row.
+    """
+    session_cache = _session_cache(ses)
+    if not force_refresh:
+        cached = session_cache.get("programs")
+        if cached is not None:
+            return cached
+
+    programs = _fetch_kkn_programs(ses)
+    if programs is None:
+        return None
+    loaded = (programs, {p.get("program_mhs_id"): p for p in programs})
+    session_cache.set("programs", loaded, timeout=120)
+    return loaded
+
+
+def get_kkn_programs(ses: requests.Session, force_refresh: bool = False) -> Optional[List[Dict]]:
+    """
+    Returns the list of KKN programs. The result is cached per session for a
+    short time; pass `force_refresh=True` to bypass the cache.
+    """
+    loaded = _load_programs(ses, force_refresh)
+    return loaded[0] if loaded else None
+
+
+def get_kkn_programs_by_id(ses: requests.Session, force_refresh: bool = False) -> Optional[Dict[str, Dict]]:
+    """
+    Returns the KKN programs indexed by `program_mhs_id`, sharing the cache
+    of `get_kkn_programs`.
+    """
+    loaded = _load_programs(ses, force_refresh)
+    return loaded[1] if loaded else None
+
+
+def _find_program(ses: requests.Session, program_mhs_id: str) -> Optional[Dict]:
+    """Looks a program up by its `program_mhs_id`, logging why if it can't."""
+    programs_by_id = get_kkn_programs_by_id(ses)
+    if not programs_by_id:
+        log.warning("Could not fetch programs list to find the target program.")
+        return None
+
+    target_program = programs_by_id.get(program_mhs_id)
+    if not target_program:
+        log.warning("Program with ID '%s' not found in the program list.", program_mhs_id)
+    return target_program
+
+
+def _fetch_kkn_programs(ses: requests.Session) -> Optional[List[Dict]]:
     """
     Fetches the list of KKN programs by navigating through the KKN pages
     and using a CSRF token from the session cookie.
@@ -143,62 +560,39 @@ def get_kkn_programs(ses: requests.Session) -> Optional[List[Dict]]:
     try:
         
         kkn_main_url = f"{BASE_URL}/kkn/kkn/"
-        main_page_req = ses.get(kkn_main_url)
+        main_page_req = ses.get(kkn_main_url, stream=True)
         main_page_req.raise_for_status()
 
-        logbook_page_url_match = re.search(
-            r"<a href=['\"]([^'\"]*logbook_program[^'\"]*)['\"][^>]*>.*?Pelaksanaan Program.*?</a>",
-            main_page_req.text,
-            re.IGNORECASE | re.DOTALL,
-        )
-        if not logbook_page_url_match:
-            print("Could not find 'Pelaksanaan Program' link on the KKN main page.")
+        logbook_page_url = _find_link_stream(main_page_req, _LOGBOOK_LINK_XPATH)
+        if not logbook_page_url:
+            log.warning("Could not find 'Pelaksanaan Program' link on the KKN main page.")
             return None
-        logbook_page_url = logbook_page_url_match.group(1)
         if not logbook_page_url.startswith("http"):
             logbook_page_url = f"{BASE_URL}{logbook_page_url.lstrip('/')}"
         
-        page_req = ses.get(logbook_page_url)
+        # the csrf cookie is set from the response headers, so the body only
+        # has to be read up to the data URL
+        page_req = ses.get(logbook_page_url, stream=True)
         page_req.raise_for_status()
 
-        # --- FIX for multiple cookies ---
-        # Instead of using .get(), iterate to find the last (most specific) cookie value
-        token = None
-        for cookie in ses.cookies:
-            if cookie.name == 'simasterUGM_cookie':
-                token = cookie.value
-        
-        if not token:
-            print("Could not find 'simasterUGM_cookie' in the session after visiting the logbook page.")
+        data_url_match = _search_stream(page_req, _RE_DATA_URL)
+        if not data_url_match:
+            log.warning("Could not find data URL in logbook page's JavaScript.")
             return None
+        data_url = data_url_match.group(1).decode()
 
-        data_url_match = re.search(
-            r"'url'\s*:\s*[\"'](https://simaster\.ugm\.ac\.id/kkn/kkn/logbook_program_data/[^\"']+)",
-            page_req.text,
-        )
-        if not data_url_match:
-            print("Could not find data URL in logbook page's JavaScript.")
+        token = _get_csrf_token(ses.cookies)
+        if not token:
+            log.warning("Could not find 'simasterUGM_cookie' in the session after visiting the logbook page.")
             return None
-        data_url = data_url_match.group(1)
 
-        post_data = {
-            "draw": "1", "start": "0", "length": "25",
-            "search[value]": "", "search[regex]": "false", "dt": "{}",
-            "simasterUGM_token": token,
-            "columns[0][data]": "no", "columns[0][name]": "", "columns[0][searchable]": "false", "columns[0][orderable]": "false", "columns[0][search][value]": "", "columns[0][search][regex]": "false",
-            "columns[1][data]": "program_nama", "columns[1][name]": "", "columns[1][searchable]": "true", "columns[1][orderable]": "true", "columns[1][search][value]": "", "columns[1][search][regex]": "false",
-            "columns[2][data]": "program_mhs_judul", "columns[2][name]": "", "columns[2][searchable]": "true", "columns[2][orderable]": "true", "columns[2][search][value]": "", "columns[2][search][regex]": "false",
-            "columns[3][data]": "program_jenis_id", "columns[3][name]": "", "columns[3][searchable]": "true", "columns[3][orderable]": "true", "columns[3][search][value]": "", "columns[3][search][regex]": "false",
-            "columns[4][data]": "program_mhs_keberlanjutan", "columns[4][name]": "", "columns[4][searchable]": "true", "columns[4][orderable]": "true", "columns[4][search][value]": "", "columns[4][search][regex]": "false",
-            "columns[5][data]": "status_nama", "columns[5][name]": "", "columns[5][searchable]": "true", "columns[5][orderable]": "true", "columns[5][search][value]": "", "columns[5][search][regex]": "false",
-            "columns[6][data]": "action", "columns[6][name]": "", "columns[6][searchable]": "false", "columns[6][orderable]": "false", "columns[6][search][value]": "", "columns[6][search][regex]": "false",
-        }
+        post_data = {**_LOGBOOK_POST_TEMPLATE, "simasterUGM_token": token}
         headers = {"X-Requested-With": "XMLHttpRequest"}
 
         data_req = ses.post(data_url, data=post_data, headers=headers)
         data_req.raise_for_status()
 
-        programs_data = data_req.json()
+        programs_data = _json(data_req)
         
         new_token = programs_data.get('csrf_value')
         if new_token:
@@ -208,15 +602,49 @@ def get_kkn_programs(ses: requests.Session) -> Optional[List[Dict]]:
         return programs
 
     except requests.exceptions.RequestException as e:
-        print(f"An error occurred while fetching programs: {e}")
+        log.warning("An error occurred while fetching programs: %s", e)
         return None
     except json.JSONDecodeError:
-        print("Failed to decode JSON from the server response.")
+        log.warning("Failed to decode JSON from the server response.")
         return None
     except Exception as e:
         # This will now catch other errors, but the specific cookie error should be gone.
-        print(f"An unexpected error occurred in get_kkn_programs: {e}")
+        log.warning("An unexpected error occurred in get_kkn_programs: %s", e)
+        return None
+
+
+def _fetch_add_page(ses: requests.Session, rpp_url: str) -> Optional[requests.Response]:
+    """
+    Opens the 'Tambah' (add entry) page linked from a program's RPP page.
+
+    The link is cached per session and RPP page, so adding several entries to
+    the same program skips the RPP request. A cached link that has gone stale
+    (404) is dropped and looked up on the RPP page again.
+    """
+    session_cache = _session_cache(ses)
+    akey = f"add_page:{rpp_url}"
+    add_page_url = session_cache.get(akey)
+    if add_page_url is not None:
+        add_page_req = ses.get(add_page_url)
+        if add_page_req.status_code != 404:
+            add_page_req.raise_for_status()
+            return add_page_req
+        session_cache.delete(akey)
+
+    rpp_page_req = ses.get(rpp_url)
+    rpp_page_req.raise_for_status()
+    add_link_match = _RE_ADD_LINK.search(rpp_page_req.content)
+    if not add_link_match:
+        log.warning("Could not find 'Tambah' link on the RPP page.")
         return None
+    add_page_url = add_link_match.group(1).decode()
+
+    add_page_req = ses.get(add_page_url)
+    add_page_req.raise_for_status()
+    # the link only changes if the program does, and a stale one heals
+    # itself above, so it can outlive the program list
+    session_cache.set(akey, add_page_url, timeout=600)
+    return add_page_req
 
 
 def add_kkn_logbook_entry(
@@ -227,27 +655,20 @@ def add_kkn_logbook_entry(
     """
     try:
         action_html = program.get("action", "")
-        rpp_url_match = re.search(r"href='([^']+logbook_program_rpp[^']+)'", action_html)
+        rpp_url_match = _RE_RPP_URL.search(action_html)
         if not rpp_url_match:
-            print("Could not find RPP URL in program action.")
+            log.warning("Could not find RPP URL in program action.")
             return False
         rpp_url = rpp_url_match.group(1)
 
-        rpp_page_req = ses.get(rpp_url)
-        rpp_page_req.raise_for_status()
-        add_link_match = re.search(r"<a href='([^']+)'.*?title='Tambah'>", rpp_page_req.text)
-        if not add_link_match:
-            print("Could not find 'Tambah' link on the RPP page.")
+        add_page_req = _fetch_add_page(ses, rpp_url)
+        if add_page_req is None:
             return False
-        add_page_url = add_link_match.group(1)
 
-        add_page_req = ses.get(add_page_url)
-        add_page_req.raise_for_status()
-
-        tree = fromstring(add_page_req.content)
+        tree = _parse_html(add_page_req.content)
         form = tree.find('.//form[@id="form-usulan-program"]')
         if form is None:
-            print("Could not find the add form on the page.")
+            log.warning("Could not find the add form on the page.")
             return False
         action_url = form.get("action")
         hidden_inputs = form.xpath('.//input[@type="hidden"]')
@@ -255,23 +676,24 @@ def add_kkn_logbook_entry(
         
         form_data["dParam[judul]"] = entry_title
         form_data["dParam[pelaksanaan]"] = entry_date
-        form_data["dParam[lokasi]"] = f"{latitude}, {longitude}"
+        form_data["dParam[lokasi]"] = f"{latitude:.6f}, {longitude:.6f}"
 
         response = ses.post(action_url, data=form_data)
         response.raise_for_status()
 
-        response_data = response.json()
+        response_data = _json(response)
         if response_data.get("status") == "success":
-            print(f"Successfully added logbook entry: {response_data.get('msg')}")
+            log.info("Successfully added logbook entry: %s", response_data.get('msg'))
+            _invalidate_programs(ses)
             return True
         else:
-            print(f"Failed to add logbook entry: {response_data.get('msg')}")
+            log.warning("Failed to add logbook entry: %s", response_data.get('msg'))
             return False
     except requests.exceptions.RequestException as e:
-        print(f"An error occurred: {e}")
+        log.warning("An error occurred: %s", e)
         return False
     except Exception as e:
-        print(f"An unexpected error occurred in add_kkn_logbook_entry: {e}")
+        log.warning("An unexpected error occurred in add_kkn_logbook_entry: %s", e)
         return False
 
 
@@ -280,19 +702,8 @@ def add_kkn_logbook_entry_by_id(
     ses: requests.Session, program_mhs_id: str, entry_title: str, entry_date: str, latitude: float, longitude: float
 ) -> bool:
     """add a logbook entry by its program_mhs_id."""
-    programs = get_kkn_programs(ses)
-    if not programs:
-        print("Could not fetch programs list.")
-        return False
-    
-    target_program = None
-    for program in programs:
-        if program.get("program_mhs_id") == program_mhs_id:
-            target_program = program
-            break
-
+    target_program = _find_program(ses, program_mhs_id)
     if not target_program:
-        print(f"Program with ID '{program_mhs_id}' not found.")
         return False
 
     return add_kkn_logbook_entry(ses, target_program, entry_title, entry_date, latitude, longitude)
@@ -301,109 +712,123 @@ def get_logbook_entries_by_id(ses: requests.Session, program_mhs_id: str) -> Opt
     """
     Fetches the logbook entries (RPP) for a specific KKN program, including detailed sub-entries.
     """
-    try:
-        programs = get_kkn_programs(ses)
-        if not programs:
-            print("Could not fetch programs list to find the target program.")
-            return None
+    target_program = _find_program(ses, program_mhs_id)
+    if not target_program:
+        return None
 
-        target_program = next((p for p in programs if p.get("program_mhs_id") == program_mhs_id), None)
-        
-        if not target_program:
-            print(f"Program with ID '{program_mhs_id}' not found in the program list.")
-            return None
+    return get_logbook_entries(ses, target_program)
 
-        action_html = target_program.get("action", "")
-        rpp_url_match = re.search(r"href='([^']+logbook_program_rpp[^']+)'", action_html)
-        if not rpp_url_match:
-            print("Could not find RPP URL in program's action HTML.")
+
+def get_logbook_entries_for_programs(
+    ses: requests.Session, programs: List[Dict], max_workers: int = 6
+) -> Dict[str, Optional[List[Dict]]]:
+    """
+    Fetches the logbook entries of several programs concurrently over the
+    session's connection pool. Returns a dict keyed by `program_mhs_id`.
+    """
+    if not programs:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(programs))) as executor:
+        results = executor.map(lambda program: get_logbook_entries(ses, program), programs)
+        return {program.get("program_mhs_id"): entries for program, entries in zip(programs, results)}
+
+
+def _fetch_rpp(
+    ses: requests.Session, target_program: Dict
+) -> Optional[Tuple[Iterator, Optional[str]]]:
+    """
+    Requests the RPP page of a program as a stream and returns the rows of its
+    logbook table (see `_iter_table_rows`) together with the CSRF token
+    SIMASTER sets on that response, falling back to the session's cookie.
+    Returns `None` if the program's action HTML has no RPP link.
+    """
+    action_html = target_program.get("action", "")
+    rpp_url_match = _RE_RPP_URL.search(action_html)
+    if not rpp_url_match:
+        log.warning("Could not find RPP URL in program's action HTML.")
+        return None
+    rpp_url = rpp_url_match.group(1)
+
+    rpp_page_req = ses.get(rpp_url, stream=True)
+    rpp_page_req.raise_for_status()
+
+    page_token = _get_csrf_token(rpp_page_req.cookies) or _get_csrf_token(ses.cookies)
+
+    return _iter_table_rows(rpp_page_req, "datatables2"), page_token
+
+
+def _parse_sub(cell) -> Dict:
+    """
+    Parses the text cell of a logbook sub-entry row, which reads like
+    "Title (Date and Time) [Duration]" followed by its attendance status.
+    """
+    full_text = ' '.join(cell.text_content().split())
+    match = _RE_SUB_ENTRY.search(full_text)
+
+    sub_data = { "is_attended": "Sudah Presensi" in full_text }
+    if match:
+        sub_data['title'] = match.group('title').strip()
+        sub_data['datetime_str'] = match.group('datetime_str').strip()
+        sub_data['duration'] = match.group('duration').strip()
+    else:
+        # Fallback for unexpected formats
+        sub_data['title'] = full_text
+        sub_data['datetime_str'] = "N/A"
+        sub_data['duration'] = "N/A"
+    return sub_data
+
+
+def get_logbook_entries(ses: requests.Session, target_program: Dict) -> Optional[List[Dict]]:
+    """
+    Fetches the logbook entries (RPP) of an already resolved program dict,
+    including detailed sub-entries.
+    """
+    try:
+        rpp = _fetch_rpp(ses, target_program)
+        if rpp is None:
             return None
-        rpp_url = rpp_url_match.group(1)
+        rows, _ = rpp
 
-        rpp_page_req = ses.get(rpp_url)
-        rpp_page_req.raise_for_status()
-        
-        tree = fromstring(rpp_page_req.content)
-        rows = tree.xpath('//table[@id="datatables2"]/tbody/tr')
-        
         entries = []
-        i = 0
-        while i < len(rows):
-            main_row = rows[i]
-            cols = main_row.findall('td')
+        current_entry = None
+        for row in rows:
+            cols = _ROW_TDS(row)
 
             # This is a main entry row
             if len(cols) == 5:
-                action_html_str = tostring(cols[4], pretty_print=True).decode('utf-8')
-                kegiatan_match = re.search(r"href=['\"]([^'\"]*logbook_kegiatan[^'\"]*)['\"]", action_html_str)
+                kegiatan_hrefs = _KEGIATAN_XPATH(cols[4])
 
-                entry_data = {
+                current_entry = {
                     "entry_index": int(cols[0].text_content().strip()),
-                    "kegiatan_url": kegiatan_match.group(1) if kegiatan_match else None,
+                    "kegiatan_url": kegiatan_hrefs[0] if kegiatan_hrefs else None,
                     "title": cols[1].text_content().strip(),
                     "date": cols[2].text_content().strip(),
                     "location": cols[3].text_content().strip(),
                     "sub_entries": []
                 }
+                entries.append(current_entry)
 
-                # Look ahead for all consecutive sub-entry rows
-                all_sub_attended = False
-                notattendedflag = True
-                sub_entry_found = False
-                j = i + 1
-                while j < len(rows):
-                    sub_row = rows[j]
-                    sub_cols = sub_row.findall('td')
-                    if len(sub_cols) == 2 and not sub_cols[0].text_content().strip():
-                        full_text = ' '.join(sub_cols[1].text_content().split())
-                        is_attended = "Sudah Presensi" in full_text
-                        if is_attended and notattendedflag:
-                            all_sub_attended = True
-                        elif not is_attended:
-                            notattendedflag = False
-                            all_sub_attended = False
-                        # More powerful regex to capture title, datetime, and duration
-                        sub_entry_pattern = re.compile(
-                            r'^(?P<title>.*?)\s+'
-                            r'\((?P<datetime_str>.*? \d{2}:\d{2}.*?)\)\s+'
-                            r'\[(?P<duration>.*?)\]'
-                        )
-                        match = sub_entry_pattern.search(full_text)
-                        
-                        sub_data = { "is_attended": is_attended }
-                        if match:
-                            sub_data['title'] = match.group('title').strip()
-                            sub_data['datetime_str'] = match.group('datetime_str').strip()
-                            sub_data['duration'] = match.group('duration').strip()
-                        else:
-                            # Fallback for unexpected formats
-                            sub_data['title'] = full_text
-                            sub_data['datetime_str'] = "N/A"
-                            sub_data['duration'] = "N/A"
-                        sub_entry_found = True
-                        entry_data["sub_entries"].append(sub_data)
-                        j += 1
-                    else:
-                        break# Not a sub-row, break the inner loop
-                
-                # Determine overall status
-                if not sub_entry_found:
-                    entry_data["attendance_status"] = "Belum Presensi"
-                else:
-                    entry_data["attendance_status"] = "Sudah Presensi" if all_sub_attended else "Belum Presensi"
+            # A sub-entry row belongs to the main entry right above it
+            elif current_entry is not None and len(cols) == 2 and not cols[0].text_content().strip():
+                current_entry["sub_entries"].append(_parse_sub(cols[1]))
 
-                entries.append(entry_data)
-                i = j # Move the main index past all the rows we just processed
             else:
-                i += 1 # Not a main row, just move to the next one
-        
+                # Not a main row or a sub-row; following sub-rows are orphans
+                current_entry = None
+
+        # An entry only counts as attended once every one of its sub-entries is
+        for entry_data in entries:
+            sub_entries = entry_data["sub_entries"]
+            all_sub_attended = bool(sub_entries) and all(sub["is_attended"] for sub in sub_entries)
+            entry_data["attendance_status"] = "Sudah Presensi" if all_sub_attended else "Belum Presensi"
+
         return entries
 
     except requests.exceptions.RequestException as e:
-        print(f"An error occurred while fetching logbook entries: {e}")
+        log.warning("An error occurred while fetching logbook entries: %s", e)
         return None
     except Exception as e:
-        print(f"An unexpected error occurred in get_logbook_entries_by_id: {e}")
+        log.warning("An unexpected error occurred in get_logbook_entries: %s", e)
         return None
 
 
@@ -415,9 +840,9 @@ def get_bantu_pic_entries(ses: requests.Session, entry_point_program: Dict) -> O
     try:
         # 1. Get the RPP page URL from the user's own program entry
         action_html = entry_point_program.get("action", "")
-        rpp_url_match = re.search(r"href='([^']+logbook_program_rpp[^']+)'", action_html)
+        rpp_url_match = _RE_RPP_URL.search(action_html)
         if not rpp_url_match:
-            print("Could not find RPP URL in the selected program's action HTML.")
+            log.warning("Could not find RPP URL in the selected program's action HTML.")
             return None
         rpp_url = rpp_url_match.group(1)
 
@@ -425,20 +850,18 @@ def get_bantu_pic_entries(ses: requests.Session, entry_point_program: Dict) -> O
         rpp_page_req = ses.get(rpp_url)
         rpp_page_req.raise_for_status()
 
-        tree = fromstring(rpp_page_req.content)
+        tree = _parse_html(rpp_page_req.content)
         
         # 3. Find the panel for "Program Bantu"
-        bantu_panel_heading = tree.xpath('//*[@id="subcontent-element"]/div[4]/div[2]/div[2]/table')
+        bantu_panel_heading = _BANTU_TABLE_XPATH(tree)
         if not bantu_panel_heading:
-            print("Could not find the 'Program Bantu' panel.")
+            log.warning("Could not find the 'Program Bantu' panel.")
             return []
         bantu_panel = bantu_panel_heading[0].getparent().getparent()
-        rows = bantu_panel.xpath('.//table/tbody/tr')
-
         pic_entries = []
         
-        for i, row in enumerate(rows):
-            cols = row.findall('td')
+        for row in _BANTU_ROWS_XPATH(bantu_panel):
+            cols = _ROW_TDS(row)
 
             # Case 1: Main Entry Row (has 6 columns with a number in the first cell)
             if len(cols) == 6 and cols[0].text_content().strip().isdigit():
@@ -459,12 +882,7 @@ def get_bantu_pic_entries(ses: requests.Session, entry_point_program: Dict) -> O
                 # All data is in the second column (index 1)
                 sub_entry_cell_text = cols[1].text_content().strip()
                 
-                # Regex to extract title and datetime from the text content.
-                # It looks for a pattern like "Title (Date and Time WIB) [Duration]"
-                sub_entry_pattern = re.compile(
-                    r'^(?P<title>.*?)\s\((?P<datetime_str>.*?WIB)\)'
-                )
-                match = sub_entry_pattern.search(sub_entry_cell_text)
+                match = _RE_BANTU_SUB_ENTRY.search(sub_entry_cell_text)
 
                 if match:
                     sub_title = match.group('title').strip()
@@ -485,10 +903,10 @@ def get_bantu_pic_entries(ses: requests.Session, entry_point_program: Dict) -> O
         return pic_entries
 
     except requests.exceptions.RequestException as e:
-        print(f"An HTTP error occurred: {e}")
+        log.warning("An HTTP error occurred: %s", e)
         return None
-    except (IndexError, AttributeError) as e:
-        print(f"Failed to parse the HTML structure for Program Bantu: {e}")
+    except (IndexError, AttributeError, etree.ParserError) as e:
+        log.warning("Failed to parse the HTML structure for Program Bantu: %s", e)
         return None
 
 
@@ -502,20 +920,20 @@ def create_sub_entry_base(
         kegiatan_page_req = ses.get(kegiatan_url)
         kegiatan_page_req.raise_for_status()
 
-        add_form_url_match = re.search(r"<a href='([^']+)'.*?title='Tambah'>", kegiatan_page_req.text)
+        add_form_url_match = _RE_ADD_LINK.search(kegiatan_page_req.content)
         if not add_form_url_match:
-            print("Could not find 'Tambah' (Add) link on the 'Kegiatan' page.")
+            log.warning("Could not find 'Tambah' (Add) link on the 'Kegiatan' page.")
             return False
         
-        add_form_url = add_form_url_match.group(1)
+        add_form_url = add_form_url_match.group(1).decode()
 
         form_page_req = ses.get(add_form_url)
         form_page_req.raise_for_status()
 
-        tree = fromstring(form_page_req.content)
+        tree = _parse_html(form_page_req.content)
         form = tree.find('.//form')
         if form is None:
-            print("Could not find the sub-entry form on the page.")
+            log.warning("Could not find the sub-entry form on the page.")
             return False
 
         action_url = form.get("action")
@@ -537,26 +955,24 @@ def create_sub_entry_base(
         response = ses.post(action_url, data=form_data)
         response.raise_for_status()
         
-        try:
-            response_json = response.json()
-            if response_json.get("status") == "success":
-                print(f"Successfully created new sub-entry: {response_json.get('msg')}")
-                return True
-            else:
-                print(f"Failed to create sub-entry. Server response: {response_json}")
-                return False
-        except json.JSONDecodeError:
+        response_json = _json_object(response.content)
+        if response_json is None:
             if response.status_code == 200:
-                print("Successfully created new sub-entry (judging by status code).")
+                log.info("Successfully created new sub-entry (judging by status code).")
                 return True
-            print(f"Failed to create sub-entry and response was not valid JSON.")
+            log.warning("Failed to create sub-entry and response was not valid JSON.")
             return False
+        if response_json.get("status") == "success":
+            log.info("Successfully created new sub-entry: %s", response_json.get('msg'))
+            return True
+        log.warning("Failed to create sub-entry. Server response: %s", response_json)
+        return False
 
     except requests.exceptions.RequestException as e:
-        print(f"An error occurred while creating sub-entry: {e}")
+        log.warning("An error occurred while creating sub-entry: %s", e)
         return False
     except Exception as e:
-        print(f"An unexpected error occurred in create_sub_entry_base: {e}")
+        log.warning("An unexpected error occurred in create_sub_entry_base: %s", e)
         return False
 
 def create_sub_entry(
@@ -565,7 +981,7 @@ def create_sub_entry(
     """Creates a new sub-entry (kegiatan) under a main logbook entry."""
     kegiatan_url = main_entry.get("kegiatan_url")
     if not kegiatan_url:
-        print("Selected main entry is missing the 'kegiatan_url'. Cannot proceed.")
+        log.warning("Selected main entry is missing the 'kegiatan_url'. Cannot proceed.")
         return False
     return create_sub_entry_base(ses, kegiatan_url, form_details)
 
@@ -575,106 +991,211 @@ def create_bantu_pic_sub_entry(
     """Creates a new sub-entry (kegiatan) under a PIC-assisted logbook entry."""
     kegiatan_url = pic_entry.get("kegiatan_url")
     if not kegiatan_url:
-        print("Selected PIC entry is missing the 'kegiatan_url'. Cannot proceed.")
+        log.warning("Selected PIC entry is missing the 'kegiatan_url'. Cannot proceed.")
         return False
     return create_sub_entry_base(ses, kegiatan_url, form_details)
 
 
-def post_attendance_for_sub_entry(ses: requests.Session, program_mhs_id: str, main_entry_index: int, sub_entry_title_to_find: str, latitude: float, longitude: float) -> bool:
+def _find_sub_entry_row(rows, main_entry_index: int, sub_entry_title: str):
+    """
+    Walks the RPP table rows once: finds main entry #`main_entry_index`, then
+    looks through the sub-entry rows right below it for `sub_entry_title`.
+
+    Returns the matching row, or `None` (after logging why) if either the main
+    entry or the sub-entry is missing. The row is only valid until `rows` is
+    advanced again.
+    """
+    main_entry_found = False
+    for row in rows:
+        cols = _ROW_TDS(row)
+        if not main_entry_found:
+            if len(cols) == 5 and int(cols[0].text_content().strip()) == main_entry_index:
+                main_entry_found = True
+            continue
+
+        if len(cols) != 2: break
+
+        if sub_entry_title in cols[1].text_content():
+            return row
+
+    if not main_entry_found:
+        log.warning("Error: Could not find main entry #%s.", main_entry_index)
+    else:
+        log.warning("Error: Could not find sub-entry '%s'.", sub_entry_title)
+    return None
+
+def _presensi_payload(
+    ajaxify_url: str, lat_s: str, lon_s: str, token: str
+) -> Optional[Dict]:
+    """
+    Builds the attendance post for a sub-entry from the ids in its 'Presensi'
+    button's `ajaxify` URL and the already formatted coordinates. Returns
+    `None` if the URL has an unexpected format.
+    """
+    # the last five path segments carry the ids, ignore any
+    # query string, fragment or trailing slash
+    url_parts = urlsplit(ajaxify_url).path.strip('/').rsplit('/', 5)
+    if len(url_parts) < 5:
+        return None
+
+    return {
+        "timelineId": url_parts[-5],
+        "rppJenisProgram": url_parts[-4],
+        "rppMhsId": url_parts[-3],
+        "kegiatanMhsId": url_parts[-2],
+        "programMhsId": url_parts[-1],
+        "agreement": "1",
+        "latitude": lat_s,
+        "longtitude": lon_s,
+        "simasterUGM_token": token
+    }
+
+def _post_presensi(ses: requests.Session, payload: Dict) -> bool:
+    """Sends a sub-entry attendance post and reports the server's verdict."""
+    action_url = f"{BASE_URL}/kkn/kkn/logbook_kegiatan_presensi"
+    response = ses.post(action_url, data=payload)
+    response.raise_for_status()
+
+    response_json = _json(response)
+    if response_json.get("status") == "success":
+        log.info("SUCCESS: %s", response_json.get('msg'))
+        return True
+    else:
+        log.warning("FAILED: Server response: %s", response_json.get('msg'))
+        return False
+
+def post_attendance_for_sub_entry(
+    ses: requests.Session,
+    program_mhs_id: str,
+    main_entry_index: int,
+    sub_entry_title_to_find: str,
+    latitude: float,
+    longitude: float,
+    *,
+    target_program: Optional[Dict] = None,
+) -> bool:
     """
     Finds a specific sub-entry and posts attendance using a specific token
     captured from the RPP page response.
+
+    Callers that already hold the program dict can pass it as `target_program`
+    to skip the (cached) program list lookup.
     """
     try:
-        
-        programs = get_kkn_programs(ses)
-        if not programs: return False
-        target_program = next((p for p in programs if p.get("program_mhs_id") == program_mhs_id), None)
-        if not target_program:
-            print(f"Program with ID '{program_mhs_id}' not found.")
+        if target_program is None:
+            target_program = _find_program(ses, program_mhs_id)
+            if not target_program: return False
+
+        rpp = _fetch_rpp(ses, target_program)
+        if rpp is None: return False
+        rows, page_token = rpp
+        if not page_token:
+            log.warning("Fallback failed. Cannot find a valid token.")
             return False
-        action_html = target_program.get("action", "")
-        rpp_url_match = re.search(r"href='([^']+logbook_program_rpp[^']+)'", action_html)
-        if not rpp_url_match: return False
-        rpp_url = rpp_url_match.group(1)
-        
-        rpp_page_req = ses.get(rpp_url)
-        rpp_page_req.raise_for_status()
 
-        page_token = None
-        for cookie in rpp_page_req.cookies:
-            if cookie.name == 'simasterUGM_cookie':
-                page_token = cookie.value
+        row = _find_sub_entry_row(rows, main_entry_index, sub_entry_title_to_find)
+        if row is None: return False
 
-        if not page_token:
-            for cookie in ses.cookies:
-                if cookie.name == 'simasterUGM_cookie':
-                    page_token = cookie.value
-            if not page_token:
-                 print("Fallback failed. Cannot find a valid token.")
-                 return False
-
-        tree = fromstring(rpp_page_req.content)
-        rows = tree.xpath('//table[@id="datatables2"]/tbody/tr')
-
-        i = 0
-        while i < len(rows):
-            main_row = rows[i]
-            cols = main_row.findall('td')
-
-            if len(cols) != 5 or int(cols[0].text_content().strip()) != main_entry_index:
-                i += 1
-                continue
-            
-            j = i + 1
-            while j < len(rows):
-                sub_row = rows[j]
-                if len(sub_row.findall('td')) != 2: break
-
-                if sub_entry_title_to_find in sub_row.text_content():
-                    presensi_buttons = sub_row.xpath(".//a[contains(., 'Presensi')]")
-                    if not presensi_buttons:
-                        print("No 'Presensi' button available for this sub-entry (already attended?).")
-                        return False
-                    
-                    ajaxify_url = presensi_buttons[0].get('ajaxify')
-                    if not ajaxify_url:
-                        print("ERROR: 'Presensi' button has no 'ajaxify' URL.")
-                        return False
-                    
-                    url_parts = [part for part in ajaxify_url.split('/') if part]
-                    
-                    payload = {
-                        "timelineId": url_parts[-5],
-                        "rppJenisProgram": url_parts[-4],
-                        "rppMhsId": url_parts[-3],
-                        "kegiatanMhsId": url_parts[-2],
-                        "programMhsId": url_parts[-1],
-                        "agreement": "1",
-                        "latitude": str(latitude),
-                        "longtitude": str(longitude),
-                        "simasterUGM_token": page_token
-                    }
-                    
-                    action_url = f"{BASE_URL}/kkn/kkn/logbook_kegiatan_presensi"
-                    response = ses.post(action_url, data=payload)
-                    response.raise_for_status()
-                    
-                    response_json = response.json()
-                    if response_json.get("status") == "success":
-                        print(f"SUCCESS: {response_json.get('msg')}")
-                        return True
-                    else:
-                        print(f"FAILED: Server response: {response_json.get('msg')}")
-                        return False
-                j += 1
-            
-            print(f"Error: Could not find sub-entry '{sub_entry_title_to_find}'.")
+        presensi_buttons = row.xpath(".//a[contains(., 'Presensi')]")
+        if not presensi_buttons:
+            log.warning("No 'Presensi' button available for this sub-entry (already attended?).")
+            return False
+
+        ajaxify_url = presensi_buttons[0].get('ajaxify')
+        # everything needed from the page is in hand, so close the RPP
+        # response now rather than holding its connection during the post
+        rows.close()
+        if not ajaxify_url:
+            log.warning("ERROR: 'Presensi' button has no 'ajaxify' URL.")
             return False
-        
-        print(f"Error: Could not find main entry #{main_entry_index}.")
-        return False
+
+        payload = _presensi_payload(
+            ajaxify_url, format(latitude, ".6f"), format(longitude, ".6f"), page_token
+        )
+        if payload is None:
+            log.warning("ERROR: Unexpected 'ajaxify' URL format: %s", ajaxify_url)
+            return False
+
+        return _post_presensi(ses, payload)
 
     except Exception as e:
-        print(f"An unexpected error occurred in post_attendance_for_sub_entry: {e}")
+        log.warning("An unexpected error occurred in post_attendance_for_sub_entry: %s", e)
         return False
+
+def post_attendance_for_sub_entries(
+    ses: requests.Session,
+    program_mhs_id: str,
+    items: List[Tuple[int, str]],
+    latitude: float,
+    longitude: float,
+    *,
+    target_program: Optional[Dict] = None,
+) -> Dict[Tuple[int, str], bool]:
+    """
+    Posts attendance for several sub-entries of one program. `items` holds
+    `(main_entry_index, sub_entry_title)` pairs. The RPP page is fetched and
+    scanned once for all of them, then the posts are sent one after another:
+    SIMASTER rotates its CSRF token on every response, so each post carries
+    the token the previous one left in the session.
+
+    Returns a dict mapping each `(main_entry_index, sub_entry_title)` pair to
+    whether its post succeeded.
+    """
+    results = {item: False for item in items}
+    try:
+        if target_program is None:
+            target_program = _find_program(ses, program_mhs_id)
+            if not target_program: return results
+
+        rpp = _fetch_rpp(ses, target_program)
+        if rpp is None: return results
+        rows, page_token = rpp
+        if not page_token:
+            log.warning("Fallback failed. Cannot find a valid token.")
+            return results
+
+        # every post carries the same coordinates, so format them once
+        lat_s, lon_s = format(latitude, ".6f"), format(longitude, ".6f")
+
+        wanted: Dict[int, List[str]] = {}
+        for main_entry_index, title in items:
+            wanted.setdefault(main_entry_index, []).append(title)
+
+        # one forward scan: remember which main entry the sub-rows belong to
+        # and pick up the 'Presensi' button of every wanted sub-entry
+        ajaxify_urls = {}
+        main_entry_index, titles = None, []
+        for row in rows:
+            cols = _ROW_TDS(row)
+            if len(cols) == 5:
+                main_entry_index = int(cols[0].text_content().strip())
+                titles = wanted.get(main_entry_index, [])
+                continue
+            if len(cols) != 2 or not titles: continue
+
+            cell_text = cols[1].text_content()
+            for title in titles:
+                item = (main_entry_index, title)
+                if item in ajaxify_urls or title not in cell_text: continue
+                presensi_buttons = row.xpath(".//a[contains(., 'Presensi')]")
+                ajaxify_urls[item] = presensi_buttons[0].get('ajaxify') if presensi_buttons else None
+
+        token = page_token
+        for item in results:
+            if item not in ajaxify_urls:
+                log.warning("Error: Could not find sub-entry '%s' under main entry #%s.", item[1], item[0])
+                continue
+            payload = ajaxify_urls[item] and _presensi_payload(ajaxify_urls[item], lat_s, lon_s, token)
+            if not payload:
+                log.warning("No usable 'Presensi' button for sub-entry '%s' (already attended?).", item[1])
+                continue
+            try:
+                results[item] = _post_presensi(ses, payload)
+            except Exception as e:
+                log.warning("An error occurred while posting attendance for '%s': %s", item[1], e)
+            token = _get_csrf_token(ses.cookies) or token
+        return results
+
+    except Exception as e:
+        log.warning("An unexpected error occurred in post_attendance_for_sub_entries: %s", e)
+        return results
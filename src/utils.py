@@ -1,8 +1,19 @@
 import random
 import math
+from collections import namedtuple
 from datetime import datetime, timedelta
 
 
+# one activity on the KKN timeline. start_time comes first so a list of events
+# sorts chronologically without a key function.
+TimelineEvent = namedtuple("TimelineEvent", "start_time end_time title type color")
+
+
+EARTH_RADIUS = 6378137.0 # (WGS84 spheroid)
+# degrees of latitude per meter, with the radians -> degrees conversion folded in
+DEG_PER_METER = math.degrees(1.0) / EARTH_RADIUS
+
+
 def generate_random_point(lat, lon, radius_m):
     """
     Generates a random GPS coordinate within a given radius of a starting point.
@@ -15,34 +26,58 @@ def generate_random_point(lat, lon, radius_m):
     Returns:
         tuple: A tuple containing the new latitude and longitude.
     """
-    earth_radius = 6378137.0 # (WGS84 spheroid)
-
-    # --- convert radius from meters to degrees ---
-
-    # offset in radians
+    # offset in meters; the sqrt keeps the points uniform over the area
     random_dist = math.sqrt(random.random()) * radius_m
-    
+
     # random angle in radians
-    random_angle = 2 * math.pi * random.random()
+    random_angle = math.tau * random.random()
 
-    # calculate the change in latitude (north-south direction)
-    # the distance for a degree of latitude is relatively constant.
-    delta_lat_rad = (random_dist / earth_radius) * math.sin(random_angle)
+    # the distance for a degree of latitude is relatively constant, while the
+    # distance for a degree of longitude depends on the latitude (the earth's
+    # curvature).
+    delta_lat_deg = random_dist * DEG_PER_METER * math.sin(random_angle)
+    delta_lon_deg = random_dist * DEG_PER_METER / math.cos(math.radians(lat)) * math.cos(random_angle)
 
-    # calculate the change in longitude (east-west direction)
-    # the distance for a degree of longitude depends on the latitude.
-    # we need to account for the earth's curvature.
-    delta_lon_rad = (random_dist / (earth_radius * math.cos(math.radians(lat)))) * math.cos(random_angle)
+    # add the offsets to the original point
+    return (lat + delta_lat_deg, lon + delta_lon_deg)
 
-    # convert radian offsets to degree offsets
-    delta_lat_deg = math.degrees(delta_lat_rad)
-    delta_lon_deg = math.degrees(delta_lon_rad)
 
-    # add the offsets to the original point
-    new_lat = lat + delta_lat_deg
-    new_lon = lon + delta_lon_deg
+def generate_random_points(lat, lon, radius_m, n):
+    """
+    Generates `n` random GPS coordinates, spread uniformly over the disc of the
+    given radius around a starting point.
+
+    Args:
+        lat (float): The latitude of the center point.
+        lon (float): The longitude of the center point.
+        radius_m (int): The radius in meters.
+        n (int): The number of points to generate.
+
+    Returns:
+        list: A list of (latitude, longitude) tuples.
+    """
+    # the distance for a degree of latitude is relatively constant, while the
+    # distance for a degree of longitude depends on the latitude (the earth's
+    # curvature). both are the same for every point, so work them out once.
+    lat_scale = DEG_PER_METER
+    lon_scale = DEG_PER_METER / math.cos(math.radians(lat))
 
-    return (new_lat, new_lon)
+    points = []
+    for _ in range(n):
+        # offset in meters; the sqrt keeps the points uniform over the area
+        random_dist = math.sqrt(random.random()) * radius_m
+
+        # random angle in radians
+        random_angle = math.tau * random.random()
+
+        # offsets in degrees
+        delta_lat_deg = random_dist * lat_scale * math.sin(random_angle)
+        delta_lon_deg = random_dist * lon_scale * math.cos(random_angle)
+
+        # add the offsets to the original point
+        points.append((lat + delta_lat_deg, lon + delta_lon_deg))
+
+    return points
 
 # the time window in which attendance should be posted (24-hour format).
 # the script will pick a random time between these hours.
@@ -76,14 +111,13 @@ def get_next_run_time() -> datetime:
         target_day = now
         print("Scheduling for today...")
 
-    # pick a random time within the window for the target day.
-    random_hour = random.randint(RUN_WINDOW_START_HOUR, RUN_WINDOW_END_HOUR - 1)
-    random_minute = random.randint(0, 59)
-    random_second = random.randint(0, 59)
+    # pick a random second within the window for the target day.
+    window_seconds = (RUN_WINDOW_END_HOUR - RUN_WINDOW_START_HOUR) * 3600
+    offset = random.randrange(window_seconds)
 
     next_time = target_day.replace(
-        hour=random_hour, minute=random_minute, second=random_second, microsecond=0
-    )
+        hour=RUN_WINDOW_START_HOUR, minute=0, second=0, microsecond=0
+    ) + timedelta(seconds=offset)
 
     return next_time
 
@@ -0,0 +1,88 @@
+import pytest
+
+from src import simaster
+
+
+class FakeStreamResponse:
+    """Stands in for a streamed `requests.Response`, yielding `body` in the given chunk sizes."""
+
+    def __init__(self, body: bytes, chunk_size: int):
+        self.body = body
+        self.chunk_size = chunk_size
+        self.closed = False
+
+    def iter_content(self, chunk_size=None):
+        for start in range(0, len(self.body), self.chunk_size):
+            yield self.body[start:start + self.chunk_size]
+
+    def close(self):
+        self.closed = True
+
+
+DATA_URL = "https://simaster.ugm.ac.id/kkn/kkn/logbook_program_data/Zm9vYmFy"
+LOGBOOK_PAGE = (
+    b"<html><body><script>$('#datatables').DataTable({'ajax': {'url': '"
+    + DATA_URL.encode()
+    + b"', 'type': 'POST'}});</script></body></html>"
+)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, len(LOGBOOK_PAGE)])
+def test_search_stream_finds_whole_data_url(chunk_size):
+    response = FakeStreamResponse(LOGBOOK_PAGE, chunk_size)
+    match = simaster._search_stream(response, simaster._RE_DATA_URL)
+    assert match is not None
+    assert match.group(1).decode() == DATA_URL
+    assert response.closed
+
+
+def test_search_stream_returns_none_without_match():
+    response = FakeStreamResponse(b"<html></html>", 4)
+    assert simaster._search_stream(response, simaster._RE_DATA_URL) is None
+    assert response.closed
+
+
+RPP_PAGE = b"""<html><body>
+<table id="other"><tbody><tr><td>ignored</td></tr></tbody></table>
+<table id="datatables2"><tbody>
+<tr><td>1</td><td>Main</td><td></td><td></td><td></td></tr>
+<tr><td></td><td>Sub <table><tbody><tr><td>nested detail</td></tr></tbody></table></td></tr>
+</tbody></table>
+</body></html>"""
+
+
+@pytest.mark.parametrize("chunk_size", [1, 13, 100, len(RPP_PAGE)])
+def test_iter_table_rows_keeps_nested_tables(chunk_size):
+    response = FakeStreamResponse(RPP_PAGE, chunk_size)
+    cells = [
+        [td.text_content().strip() for td in simaster._ROW_TDS(row)]
+        for row in simaster._iter_table_rows(response, "datatables2")
+    ]
+    assert cells == [["1", "Main", "", "", ""], ["", "Sub nested detail"]]
+    assert response.closed
+
+
+MAIN_PAGE = b"""<html><body>
+<a href="https://simaster.ugm.ac.id/kkn/kkn/logbook_program/abc">Rencana Program</a>
+<a href="https://simaster.ugm.ac.id/kkn/kkn/logbook_program/def"> Pelaksanaan
+  PROGRAM </a>
+<a href="https://simaster.ugm.ac.id/other">Pelaksanaan Program</a>
+</body></html>"""
+
+
+@pytest.mark.parametrize("chunk_size", [1, 9, 50, len(MAIN_PAGE)])
+def test_find_link_stream_picks_the_logbook_link(chunk_size):
+    response = FakeStreamResponse(MAIN_PAGE, chunk_size)
+    href = simaster._find_link_stream(response, simaster._LOGBOOK_LINK_XPATH)
+    assert href == "https://simaster.ugm.ac.id/kkn/kkn/logbook_program/def"
+    assert response.closed
+
+
+@pytest.mark.parametrize("chunk_size", [1, 17, len(RPP_PAGE)])
+def test_iter_table_rows_skips_other_tables(chunk_size):
+    response = FakeStreamResponse(RPP_PAGE, chunk_size)
+    rows = simaster._iter_table_rows(response, "datatables2")
+    first = next(rows)
+    assert simaster._ROW_TDS(first)[1].text_content() == "Main"
+    rows.close()
+    assert response.closed